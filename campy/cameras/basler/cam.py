@@ -9,8 +9,11 @@ import time
 import logging
 import sys
 import numpy as np
-from collections import deque
 import csv
+from campy.utils.timestamps import summarize
+from campy.utils.downsample import downsample
+
+log = logging.getLogger(__name__)
 
 def OpenCamera(cam_params, bufferSize=500, validation=False):
 	n_cam = cam_params["n_cam"]
@@ -20,7 +23,7 @@ def OpenCamera(cam_params, bufferSize=500, validation=False):
 	# Open and load features for all cameras
 	tlFactory = pylon.TlFactory.GetInstance()
 	devices = tlFactory.EnumerateDevices()
-	camera = pylon.InstantCamera(pylon.TlFactory.GetInstance().CreateDevice(devices[cam_index]))
+	camera = pylon.InstantCamera(tlFactory.CreateDevice(devices[cam_index]))
 	serial = devices[cam_index].GetSerialNumber()
 	camera.Close()
 	camera.StopGrabbing()
@@ -32,12 +35,14 @@ def OpenCamera(cam_params, bufferSize=500, validation=False):
 	cam_params['cameraModel'] = camera.GetDeviceInfo().GetModelName()
 
 	# Set features manually or automatically, depending on configuration
-	cam_params['frameWidth'] = camera.Width.GetValue()
-	cam_params['frameHeight'] = camera.Height.GetValue()
+	# Parameter access goes through pylon's cached node properties
+	cam_params['frameWidth'] = camera.Width.Value
+	cam_params['frameHeight'] = camera.Height.Value
 
 	# Start grabbing frames (OneByOne = first in, first out)
-	camera.MaxNumBuffer = bufferSize
-	print("Started", camera_name, "serial#", serial)
+	camera.MaxNumBuffer.Value = bufferSize
+	cam_params['bufferSize'] = bufferSize
+	log.info('Started %s serial# %s', camera_name, serial)
 
 	return camera, cam_params
 
@@ -45,16 +50,19 @@ def GrabFrames(cam_params, camera, writeQueue, dispQueue, stopQueue):
 	n_cam = cam_params["n_cam"]
 
 	cnt = 0
-	timeout = 0
-
-	# Create dictionary for appending frame number and timestamp information
-	grabdata = {}
-	grabdata['timeStamp'] = []
-	grabdata['frameNumber'] = []
+	# Block in RetrieveResult for up to ~2 frame periods (milliseconds)
+	# instead of polling with timeout 0 and spinning on exceptions
+	timeout = max(1, int(2000/cam_params['frameRate']))
 
-	numImagesToGrab = cam_params['recTimeInSec']*cam_params['frameRate']
+	numImagesToGrab = int(round(cam_params['recTimeInSec']*cam_params['frameRate']))
 	chunkLengthInFrames = int(round(cam_params["chunkLengthInSec"]*cam_params['frameRate']))
 
+	# Preallocate frame number and timestamp (int64 nanoseconds) buffers,
+	# so the grab loop writes in place instead of growing Python lists
+	grabdata = {}
+	grabdata['timeStamp'] = np.empty(numImagesToGrab, dtype=np.int64)
+	grabdata['frameNumber'] = np.arange(1, numImagesToGrab+1, dtype=np.int64)
+
 	if cam_params["displayFrameRate"] <= 0:
 		frameRatio = float('inf')
 	elif cam_params["displayFrameRate"] > 0 and cam_params["displayFrameRate"] <= cam_params['frameRate']:
@@ -67,54 +75,131 @@ def GrabFrames(cam_params, camera, writeQueue, dispQueue, stopQueue):
 		imageWindow.Create(n_cam)
 		imageWindow.Show()
 
+	# Bind hot attributes and parameters to locals once,
+	# so each frame avoids repeated attribute/dict lookups
+	retrieveResult = camera.RetrieveResult
+	writeAppend = writeQueue.append
+	dispAppend = dispQueue.append
+	timeStamps = grabdata['timeStamp']
+	ds = cam_params["displayDownsample"]
+	usePylonWindow = (sys.platform == 'win32' and cam_params['cameraMake'] == 'basler')
+
+	# Countdown counters replace per-frame modulo tests;
+	# frameRatio is inf when display is disabled
+	displayEnabled = frameRatio != float('inf')
+	dispLeft = frameRatio if displayEnabled else 0
+	chunkLeft = chunkLengthInFrames
+
+	# Ring of preallocated frame buffers for the writer path, sized to
+	# the camera's buffer count; the grab loop copies each frame into
+	# the next slot so steady state does no per-frame allocation. When
+	# the writer lags into the ring, the loop falls back to allocating
+	# fresh frames so queued slots are never overwritten.
+	# Allocated lazily once the first frame reveals shape and dtype
+	ringSize = cam_params['bufferSize']
+	ringIdx = 0
+	frameRing = None
+	ringOverrun = False
+
+	# Small ring of reusable display buffers: one being written in the
+	# grab loop, up to dispQueue.maxlen queued, and one held by the
+	# display consumer while it draws
+	dispRingSize = dispQueue.maxlen + 2
+	dispRing = [None]*dispRingSize
+	dispIdx = 0
+
 	camera.StartGrabbing(pylon.GrabStrategy_OneByOne)
-	print(cam_params["cameraName"], "ready to trigger.")
+	log.info('%s ready to trigger.', cam_params["cameraName"])
 
-	while(camera.IsGrabbing()):
+	while(True):
 		if stopQueue or cnt >= numImagesToGrab:
+			# Trim preallocated buffers to the number of frames actually grabbed
+			grabdata['timeStamp'] = grabdata['timeStamp'][:cnt]
+			grabdata['frameNumber'] = grabdata['frameNumber'][:cnt]
 			CloseCamera(cam_params, camera, grabdata)
-			writeQueue.append('STOP')
+			writeAppend('STOP')
 			break
 		try:
 			# Grab image from camera buffer if available
-			grabResult = camera.RetrieveResult(timeout, pylon.TimeoutHandling_ThrowException)
+			grabResult = retrieveResult(timeout, pylon.TimeoutHandling_ThrowException)
+
+			# Copy the grab buffer into the next ring slot, shared by the
+			# write and display paths; zero-copy read avoids a second copy
+			if frameRing is None:
+				frame = grabResult.Array
+				frameRing = [np.empty_like(frame) for _ in range(ringSize)]
+				frameRing[0] = frame
+			elif len(writeQueue) >= ringSize - 2:
+				# The next slot (and one the writer may still be reading)
+				# could still be queued for encoding; allocate a fresh
+				# frame instead of corrupting it
+				if not ringOverrun:
+					log.warning('Camera %i writer is %i frames behind; allocating fresh frames.',
+						n_cam, len(writeQueue))
+					ringOverrun = True
+				frame = grabResult.Array
+			else:
+				ringOverrun = False
+				frame = frameRing[ringIdx]
+				with grabResult.GetArrayZeroCopy() as zeroCopy:
+					np.copyto(frame, zeroCopy)
+			ringIdx += 1
+			if ringIdx == ringSize:
+				ringIdx = 0
 
 			# Append numpy array to writeQueue for writer to append to file
-			writeQueue.append(grabResult.Array)
+			writeAppend(frame)
 
 			if cnt == 0:
 				timeFirstGrab = grabResult.TimeStamp
-			grabtime = (grabResult.TimeStamp - timeFirstGrab)/1e9
-			grabdata['timeStamp'].append(grabtime)
-
-			cnt += 1
-			grabdata['frameNumber'].append(cnt) # first frame = 1
-
-			if cnt % frameRatio == 0:
-				if sys.platform == 'win32' and cam_params['cameraMake'] == 'basler':
-					try:
-						imageWindow.SetImage(grabResult)
-						imageWindow.Show()
-					except Exception as e:
-						logging.error('Caught exception: {}'.format(e))
-				else:
-					dispQueue.append(grabResult.Array[::cam_params["displayDownsample"],
-													::cam_params["displayDownsample"]])
+			timeStamps[cnt] = grabResult.TimeStamp - timeFirstGrab
+
+			cnt += 1 # first frame = 1
+
+			if displayEnabled:
+				dispLeft -= 1
+				if dispLeft == 0:
+					dispLeft = frameRatio
+					if usePylonWindow:
+						try:
+							imageWindow.SetImage(grabResult)
+							imageWindow.Show()
+						except Exception as e:
+							log.error('Caught exception: %s', e)
+					else:
+						# Fused subsample+copy into a reused display buffer,
+						# so the frame stays valid after the ring slot is reused
+						dispRing[dispIdx] = downsample(frame, ds, dispRing[dispIdx])
+						dispAppend(dispRing[dispIdx])
+						dispIdx += 1
+						if dispIdx == dispRingSize:
+							dispIdx = 0
 			grabResult.Release()
 
-			if cnt % chunkLengthInFrames == 0:
-				fps_count = int(round(cnt/grabtime))
-				print('Camera %i collected %i frames at %i fps.' % (n_cam,cnt,fps_count))
-		# Else wait for next frame available
+			chunkLeft -= 1
+			if chunkLeft == 0:
+				chunkLeft = chunkLengthInFrames
+				# Integer ns arithmetic; timestamps are already int64 nanoseconds
+				fps_count = (cnt*1_000_000_000)//int(timeStamps[cnt-1])
+				log.info('Camera %i collected %i frames at %i fps.', n_cam, cnt, fps_count)
+		# Else RetrieveResult timed out waiting for the next frame;
+		# the transport layer already blocked, so no sleep is needed
 		except geni.GenericException:
-			time.sleep(0.0001)
+			# Only poll the camera state off the frame path, to recover
+			# from a camera that silently stopped grabbing
+			if not camera.IsGrabbing():
+				grabdata['timeStamp'] = grabdata['timeStamp'][:cnt]
+				grabdata['frameNumber'] = grabdata['frameNumber'][:cnt]
+				CloseCamera(cam_params, camera, grabdata)
+				writeAppend('STOP')
+				break
 		except Exception as e:
-			logging.error('Caught exception: {}'.format(e))
+			log.error('Caught exception: %s', e)
 
 def CloseCamera(cam_params, camera, grabdata):
 	n_cam = cam_params["n_cam"]
 
-	print('Closing camera {}... Please wait.'.format(n_cam+1))
+	log.info('Closing camera %i... Please wait.', n_cam+1)
 	# Close Basler camera after acquisition stops
 	while(True):
 		try:
@@ -134,21 +219,31 @@ def SaveMetadata(cam_params, grabdata):
 	full_folder_name = os.path.join(cam_params["videoFolder"], cam_params["cameraName"])
 
 	# Save frame numbers and timestamps in numpy array
-	frame_count = grabdata['frameNumber'][-1]
-	time_count = grabdata['timeStamp'][-1]
+	# Timestamps are int64 nanoseconds; convert to seconds once here
+	frameNumbers = grabdata['frameNumber']
+	timeStamps = grabdata['timeStamp']/1e9
+	frame_count = int(frameNumbers[-1])
+	time_count = timeStamps[-1]
 	fps_count = int(round(frame_count/time_count))
-	print('Camera {} saved {} frames at {} fps.'.format(n_cam+1, frame_count, fps_count))
+	log.info('Camera %i saved %i frames at %i fps.', n_cam+1, frame_count, fps_count)
+
+	# Report inter-frame interval statistics for dropped-frame detection
+	if grabdata['timeStamp'].size > 1:
+		mean_dt, max_dt, dropped = summarize(grabdata['timeStamp'])
+		log.info('Camera %i inter-frame interval: mean %.3f ms, max %.3f ms, %i likely dropped.',
+			n_cam+1, mean_dt/1e6, max_dt/1e6, dropped)
+
 	try:
 		npy_filename = os.path.join(full_folder_name, 'frametimes.npy')
-		x = np.array([grabdata['frameNumber'], grabdata['timeStamp']])
+		x = np.array([frameNumbers, timeStamps])
 		np.save(npy_filename,x)
 	except:
 		pass
 
 	# Save other recording metadata in csv file
 	meta = cam_params
-	meta['totalFrames'] = grabdata['frameNumber'][-1]
-	meta['totalTime'] = grabdata['timeStamp'][-1]
+	meta['totalFrames'] = frame_count
+	meta['totalTime'] = float(time_count)
 	keys = meta.keys()
 	vals = meta.values()
 	
@@ -7,9 +7,12 @@ import time
 import logging
 import sys
 import numpy as np
-from collections import deque
 import csv
 import imageio
+from campy.utils.timestamps import summarize
+from campy.utils.downsample import downsample
+
+log = logging.getLogger(__name__)
 
 def OpenCamera(cam_params, bufferSize=500, validation=False):
 	n_cam = cam_params["n_cam"]
@@ -27,72 +30,143 @@ def OpenCamera(cam_params, bufferSize=500, validation=False):
 
 	# Start grabbing frames (OneByOne = first in, first out)
 	camera.MaxNumBuffer = bufferSize
-	print("Started", camera_name, "emulation.")
+	cam_params['bufferSize'] = bufferSize
+	log.info('Started %s emulation.', camera_name)
 	return camera, cam_params
 
 def GrabFrames(cam_params, camera, writeQueue, dispQueue, stopQueue):
 	n_cam = cam_params["n_cam"]
 
-	# Create dictionary for appending frame number and timestamp information
-	grabdata = {}
-	grabdata['timeStamp'] = []
-	grabdata['frameNumber'] = []
-
-	numImagesToGrab = cam_params['recTimeInSec']*cam_params['frameRate']
+	numImagesToGrab = int(round(cam_params['recTimeInSec']*cam_params['frameRate']))
 	chunkLengthInFrames = int(round(cam_params["chunkLengthInSec"]*cam_params['frameRate']))
 
+	# Preallocate frame number and timestamp (int64 nanoseconds) buffers,
+	# so the grab loop writes in place instead of growing Python lists
+	grabdata = {}
+	grabdata['timeStamp'] = np.empty(numImagesToGrab, dtype=np.int64)
+	grabdata['frameNumber'] = np.arange(1, numImagesToGrab+1, dtype=np.int64)
+
 	if cam_params["displayFrameRate"] <= 0:
 		frameRatio = float('inf')
 	elif cam_params["displayFrameRate"] > 0 and cam_params["displayFrameRate"] <= cam_params['frameRate']:
 		frameRatio = int(round(cam_params['frameRate']/cam_params["displayFrameRate"]))
 	else:
 		frameRatio = cam_params['frameRate']
-	print(cam_params["cameraName"], "ready to emulate.")
+	log.info('%s ready to emulate.', cam_params["cameraName"])
+
+	# Bind hot attributes and parameters to locals once,
+	# so each frame avoids repeated attribute/dict lookups
+	getData = camera.get_data
+	writeAppend = writeQueue.append
+	dispAppend = dispQueue.append
+	timeStamps = grabdata['timeStamp']
+	ds = cam_params["displayDownsample"]
+	framePeriodNs = int(round(1e9/cam_params["frameRate"]))
+	monotonicNs = time.monotonic_ns
+
+	# Countdown counters replace per-frame modulo tests;
+	# frameRatio is inf when display is disabled
+	displayEnabled = frameRatio != float('inf')
+	dispLeft = frameRatio if displayEnabled else 0
+	chunkLeft = chunkLengthInFrames
+
+	# Ring of preallocated frame buffers for the writer path; the grab
+	# loop copies each frame into the next slot so steady state does no
+	# per-frame allocation. When the writer lags into the ring, the
+	# loop falls back to pushing the fresh grab buffer so queued slots
+	# are never overwritten. Allocated lazily from the first frame
+	ringSize = cam_params['bufferSize']
+	ringIdx = 0
+	frameRing = None
+	ringOverrun = False
+
+	# Small ring of reusable display buffers: one being written in the
+	# grab loop, up to dispQueue.maxlen queued, and one held by the
+	# display consumer while it draws
+	dispRingSize = dispQueue.maxlen + 2
+	dispRing = [None]*dispRingSize
+	dispIdx = 0
 
 	cnt = 0
 	while(True):
 		if stopQueue or cnt >= numImagesToGrab:
+			# Trim preallocated buffers to the number of frames actually grabbed
+			grabdata['timeStamp'] = grabdata['timeStamp'][:cnt]
+			grabdata['frameNumber'] = grabdata['frameNumber'][:cnt]
 			CloseCamera(cam_params, camera, grabdata)
-			writeQueue.append('STOP')
+			writeAppend('STOP')
 			break
 		try:
-			timeStart = time.perf_counter()
+			timeStart = monotonicNs()
 			# Grab image from camera buffer if available
-			grabResult = camera.get_data(cnt)
+			grabResult = getData(cnt)
+
+			# Copy the frame into the next ring slot, shared by the
+			# write and display paths
+			if frameRing is None:
+				frameRing = [np.empty_like(grabResult) for _ in range(ringSize)]
+			if len(writeQueue) >= ringSize - 2:
+				# The next slot (and one the writer may still be reading)
+				# could still be queued for encoding; push the fresh grab
+				# buffer instead of corrupting it
+				if not ringOverrun:
+					log.warning('Camera %i writer is %i frames behind; allocating fresh frames.',
+						n_cam, len(writeQueue))
+					ringOverrun = True
+				frame = grabResult
+			else:
+				ringOverrun = False
+				frame = frameRing[ringIdx]
+				np.copyto(frame, grabResult)
+			ringIdx += 1
+			if ringIdx == ringSize:
+				ringIdx = 0
 
 			# Append numpy array to writeQueue for writer to append to file
-			writeQueue.append(grabResult)
+			writeAppend(frame)
 
 			if cnt == 0:
-				timeFirstGrab = time.perf_counter()
-			grabtime = (time.perf_counter() - timeFirstGrab)
-			grabdata['timeStamp'].append(grabtime)
-
-			cnt += 1
-			grabdata['frameNumber'].append(cnt) # first frame = 1
-
-			if cnt % frameRatio == 0:
-				dispQueue.append(grabResult[::cam_params["displayDownsample"],
-											::cam_params["displayDownsample"],
-											:])
-			if cnt % chunkLengthInFrames == 0:
-				fps_count = int(round(cnt/grabtime))
-				print('Camera %i collected %i frames at %i fps.' % (n_cam,cnt,fps_count))
+				timeFirstGrab = monotonicNs()
+			timeStamps[cnt] = monotonicNs() - timeFirstGrab
+
+			cnt += 1 # first frame = 1
+
+			if displayEnabled:
+				dispLeft -= 1
+				if dispLeft == 0:
+					dispLeft = frameRatio
+					# Fused subsample+copy into a reused display buffer,
+					# so the frame stays valid after the ring slot is reused
+					dispRing[dispIdx] = downsample(frame, ds, dispRing[dispIdx])
+					dispAppend(dispRing[dispIdx])
+					dispIdx += 1
+					if dispIdx == dispRingSize:
+						dispIdx = 0
+
+			chunkLeft -= 1
+			if chunkLeft == 0:
+				chunkLeft = chunkLengthInFrames
+				# Integer ns arithmetic; timestamps are already int64 nanoseconds
+				fps_count = (cnt*1_000_000_000)//int(timeStamps[cnt-1])
+				log.info('Camera %i collected %i frames at %i fps.', n_cam, cnt, fps_count)
 
 			# Waits until frame time has been reached to fix frame rate
-			while(time.perf_counter()-timeStart < 1/cam_params["frameRate"]):
+			while(monotonicNs()-timeStart < framePeriodNs):
 				pass
 
 		except Exception as e:
-			logging.error('Caught exception in grabFrames: {}'.format(e))
+			log.error('Caught exception in grabFrames: %s', e)
+			# Trim preallocated buffers to the number of frames actually grabbed
+			grabdata['timeStamp'] = grabdata['timeStamp'][:cnt]
+			grabdata['frameNumber'] = grabdata['frameNumber'][:cnt]
 			CloseCamera(cam_params, camera, grabdata)
-			writeQueue.append('STOP')
+			writeAppend('STOP')
 			break
 
 def CloseCamera(cam_params, camera, grabdata):
 	n_cam = cam_params["n_cam"]
 
-	print('Closing camera {}... Please wait.'.format(n_cam+1))
+	log.info('Closing camera %i... Please wait.', n_cam+1)
 	# Close Basler camera after acquisition stops
 	while(True):
 		try:
@@ -110,21 +184,31 @@ def SaveMetadata(cam_params, grabdata):
 	full_folder_name = os.path.join(cam_params["videoFolder"], cam_params["cameraName"])
 
 	# Save frame numbers and timestamps in numpy array
-	frame_count = grabdata['frameNumber'][-1]
-	time_count = grabdata['timeStamp'][-1]
+	# Timestamps are int64 nanoseconds; convert to seconds once here
+	frameNumbers = grabdata['frameNumber']
+	timeStamps = grabdata['timeStamp']/1e9
+	frame_count = int(frameNumbers[-1])
+	time_count = timeStamps[-1]
 	fps_count = int(round(frame_count/time_count))
-	print('Camera {} saved {} frames at {} fps.'.format(n_cam+1, frame_count, fps_count))
+	log.info('Camera %i saved %i frames at %i fps.', n_cam+1, frame_count, fps_count)
+
+	# Report inter-frame interval statistics for dropped-frame detection
+	if grabdata['timeStamp'].size > 1:
+		mean_dt, max_dt, dropped = summarize(grabdata['timeStamp'])
+		log.info('Camera %i inter-frame interval: mean %.3f ms, max %.3f ms, %i likely dropped.',
+			n_cam+1, mean_dt/1e6, max_dt/1e6, dropped)
+
 	try:
 		npy_filename = os.path.join(full_folder_name, 'frametimes.npy')
-		x = np.array([grabdata['frameNumber'], grabdata['timeStamp']])
+		x = np.array([frameNumbers, timeStamps])
 		np.save(npy_filename,x)
 	except:
 		pass
 
 	# Save other recording metadata in csv file
 	meta = cam_params
-	meta['totalFrames'] = grabdata['frameNumber'][-1]
-	meta['totalTime'] = grabdata['timeStamp'][-1]
+	meta['totalFrames'] = frame_count
+	meta['totalTime'] = float(time_count)
 	keys = meta.keys()
 	vals = meta.values()
 	
@@ -19,7 +19,7 @@ import numpy as np
 import os
 import time
 import sys
-import threading, queue
+import threading
 from collections import deque
 import multiprocessing as mp
 from campy import CampyParams
@@ -29,6 +29,16 @@ import argparse
 import ast
 import yaml
 import logging
+import importlib
+
+log = logging.getLogger(__name__)
+
+# Table of supported camera makes and their backend modules
+CAMERA_MODULES = {
+	"basler": "campy.cameras.basler.cam",
+	"flir": "campy.cameras.flir.cam",
+	"emu": "campy.cameras.emu.cam",
+}
 
 
 def LoadConfig(config_path):
@@ -50,14 +60,16 @@ def OptParams(params, cam_params, opt_params_dict):
 			if type(params[key]) is list:
 				if len(params[key]) == params["numCams"]:
 					cam_params[key] = params[key][n_cam]
-				else: print('{} list is not the same size as numCams.'.format(key))
+				else: log.warning('%s list is not the same size as numCams.', key)
 		else:
 			cam_params[key] = opt_params_dict[key]
 	return cam_params
 
 def CreateCamParams(params, n_cam):
 	# Insert camera-specific metadata from parameters into cam_params dictionary
-	cam_params = params
+	# Each camera gets its own copy, since all cam_params are built in
+	# the parent process before being handed to the workers
+	cam_params = dict(params)
 	cam_params["n_cam"] = n_cam
 	cam_params["cameraName"] = params["cameraNames"][n_cam]
 	cam_params["baseFolder"] = os.getcwd()
@@ -84,29 +96,32 @@ def CreateCamParams(params, n_cam):
 	cam_params = OptParams(params, cam_params, opt_params_dict)
 	return cam_params
 
-def AcquireOneCamera(n_cam):
-	# Initializes metadata dictionary for this camera stream
-	# and inserts important configuration details
-
-	# Load camera parameters from config
-	cam_params = CreateCamParams(params, n_cam)
+def AcquireOneCamera(cam_params):
+	# Acquires one camera stream using the cam_params built in Main.
+	# Runs in its own worker process, so camera opening and
+	# configuration overlap across cameras instead of running serially
+	logging.basicConfig(level=logging.INFO, format='%(message)s')
 
 	# Import the correct camera module for your camera
-	if cam_params["cameraMake"] == "basler":
-		from campy.cameras.basler import cam
-	elif cam_params["cameraMake"] == "flir":
-		from campy.cameras.flir import cam
-	elif cam_params["cameraMake"] == "emu":
-		from campy.cameras.emu import cam
+	if cam_params["cameraMake"] not in CAMERA_MODULES:
+		raise ValueError('Unsupported cameraMake: {}'.format(cam_params["cameraMake"]))
+	cam = importlib.import_module(CAMERA_MODULES[cam_params["cameraMake"]])
 
 	# Open camera n_cam
 	camera, cam_params = cam.OpenCamera(cam_params)
 
 	# Initialize queues for video writer
+	# All queues are deques shared between threads of this process only:
+	# single producer, single consumer, no pickling of frames.
+	# writeQueue is unbounded so no frame is dropped before encoding;
+	# the grab loop allocates fresh frames once the writer lags past
+	# its reuse ring, so queued frames are never overwritten
 	writeQueue = deque()
 	stopQueue = deque([], 1)
 
 	# Start image window display queue ('consumer' thread)
+	# maxlen=2 drops the oldest frame when the display falls behind,
+	# instead of growing memory
 	dispQueue = deque([], 2)
 	threading.Thread(
 		target=display.DisplayFrames,
@@ -283,22 +298,32 @@ def CombineConfigAndClargs(clargs):
 	return params
 
 def Main():
+	# Parse the CLI and config here rather than at import time, so
+	# importing campy.campy (e.g. from worker processes or tools) does
+	# not read sys.argv or load a config file
+	parser = argparse.ArgumentParser(
+			description="Campy CLI", formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+			)
+	clargs = ParseClargs(parser)
+	params = CombineConfigAndClargs(clargs)
+
 	# Optionally, user can manually set path to find ffmpeg binary.
 	if params["ffmpegPath"]:
 		os.environ["IMAGEIO_FFMPEG_EXE"] = params["ffmpegPath"]
 
+	# Build each camera's parameters up front and pass them to the
+	# workers explicitly, so they do not depend on module-level state
+	cam_params_list = [CreateCamParams(params, n_cam) for n_cam in range(params['numCams'])]
+
 	if sys.platform == "win32":
 		pool = mp.Pool(processes=params['numCams'])
-		pool.map(AcquireOneCamera, range(0,params['numCams']))
+		pool.map(AcquireOneCamera, cam_params_list)
 
 	elif sys.platform == "linux" or sys.platform == "linux2":
 		ctx = mp.get_context("spawn")  # for linux compatibility
 		pool = ctx.Pool(processes=params['numCams'])
-		p = pool.map_async(AcquireOneCamera, range(0,params['numCams']))
+		p = pool.map_async(AcquireOneCamera, cam_params_list)
 		p.get()
 
-parser = argparse.ArgumentParser(
-		description="Campy CLI", formatter_class=argparse.ArgumentDefaultsHelpFormatter,
-		)
-params = ParseClargs(parser)
-params = CombineConfigAndClargs(params)
\ No newline at end of file
+if __name__ == '__main__':
+	Main()
\ No newline at end of file
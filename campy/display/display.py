@@ -6,6 +6,8 @@ import time
 import logging
 import numpy as np
 
+log = logging.getLogger(__name__)
+
 import matplotlib as mpl
 mpl.use('Qt5Agg') # disregard qtapp warning...
 import matplotlib.pyplot as plt
@@ -45,7 +47,7 @@ def DisplayFrames(cam_params, dispQueue):
 						figure.canvas.draw()
 						figure.canvas.flush_events()
 					except Exception as e:
-						logging.error('Caught exception: {}'.format(e))
+						log.error('Caught exception: %s', e)
 				else:
 					time.sleep(0.01)
 			except KeyboardInterrupt:
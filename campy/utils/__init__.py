@@ -0,0 +1,2 @@
+# __init__
+
@@ -0,0 +1,34 @@
+"""
+
+"""
+
+import numpy as np
+
+try:
+	from numba import njit, prange
+	NUMBA_AVAILABLE = True
+except ImportError:
+	NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+	@njit(parallel=True, cache=True)
+	def _subsample_2d(src, dst, ds):
+		# Fused subsample and copy: contiguous row writes into dst,
+		# parallelized over output rows
+		H, W = dst.shape
+		for i in prange(H):
+			si = i*ds
+			for j in range(W):
+				dst[i, j] = src[si, j*ds]
+
+def downsample(src, ds, dst=None):
+	# Subsample src by ds into a contiguous buffer. Pass the returned
+	# buffer back in as dst on the next frame to avoid reallocation
+	view = src[::ds, ::ds]
+	if dst is None or dst.shape != view.shape or dst.dtype != src.dtype:
+		dst = np.empty(view.shape, dtype=src.dtype)
+	if NUMBA_AVAILABLE and src.ndim == 2:
+		_subsample_2d(src, dst, ds)
+	else:
+		dst[...] = view
+	return dst
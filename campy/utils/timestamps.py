@@ -0,0 +1,24 @@
+"""
+
+"""
+
+import numpy as np
+
+try:
+	from numba import njit
+except ImportError:
+	# Numba is optional; fall back to the plain numpy implementation
+	def njit(*args, **kwargs):
+		def wrap(func):
+			return func
+		return wrap
+
+@njit('Tuple((float64, int64, int64))(int64[:])', cache=True)
+def summarize(ts_ns):
+	# Mean and max inter-frame interval (nanoseconds) and number of
+	# intervals more than twice the mean (likely dropped frames)
+	dt = np.diff(ts_ns)
+	mean_dt = dt.mean()
+	max_dt = dt.max()
+	dropped = (dt > 2*mean_dt).sum()
+	return mean_dt, max_dt, dropped
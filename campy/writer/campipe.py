@@ -8,6 +8,16 @@ import time
 import logging
 import sys
 
+log = logging.getLogger(__name__)
+
+# Encoder name lookup per compression backend ('cpu' when gpuID is -1)
+CODECS = {
+	'cpu':    {'h264': 'libx264',    'h265': 'libx265'},
+	'nvidia': {'h264': 'h264_nvenc', 'h265': 'hevc_nvenc'},
+	'amd':    {'h264': 'h264_amf',   'h265': 'hevc_amf'},
+	'intel':  {'h264': 'h264_qsv',   'h265': 'hevc_qsv'},
+}
+
 def OpenWriter(cam_params):
 	n_cam = cam_params["n_cam"]
 
@@ -18,7 +28,7 @@ def OpenWriter(cam_params):
 
 	if not os.path.isdir(folder_name):
 		os.makedirs(folder_name)
-		print('Made directory {}.'.format(folder_name))
+		log.info('Made directory %s.', folder_name)
 	
 	# Load defaults
 	pix_fmt_out = cam_params["pixelFormatOutput"]
@@ -27,13 +37,10 @@ def OpenWriter(cam_params):
 
 	# CPU compression
 	if cam_params["gpuID"] == -1:
-		print('Opened: {} using CPU to compress the stream.'.format(full_file_name))
+		log.info('Opened: %s using CPU to compress the stream.', full_file_name)
 		if pix_fmt_out == 'rgb0':
 			pix_fmt_out = 'yuv420p'
-		if cam_params["codec"] == 'h264':
-			codec = 'libx264'
-		elif cam_params["codec"] == 'h265':
-			codec = 'libx265'
+		codec = CODECS['cpu'].get(codec, codec)
 		gpu_params = ['-r:v', str(cam_params["frameRate"]),
 					'-preset', 'fast',
 					'-tune', 'fastdecode',
@@ -45,12 +52,9 @@ def OpenWriter(cam_params):
 
 	# GPU compression
 	else:
-		print('Opened: {} using GPU {} to compress the stream.'.format(full_file_name, cam_params["gpuID"]))
+		log.info('Opened: %s using GPU %s to compress the stream.', full_file_name, cam_params["gpuID"])
+		codec = CODECS.get(cam_params["gpuMake"], {}).get(codec, codec)
 		if cam_params["gpuMake"] == 'nvidia':
-			if cam_params["codec"] == 'h264':
-				codec = 'h264_nvenc'
-			elif cam_params["codec"] == 'h265':
-				codec = 'hevc_nvenc'
 			gpu_params = ['-r:v', str(cam_params["frameRate"]), # important to play nice with vsync '0'
 						'-preset', 'fast', # set to 'fast', 'llhp', or 'llhq' for h264 or hevc
 						'-qp', cam_params["quality"],
@@ -61,10 +65,6 @@ def OpenWriter(cam_params):
 		elif cam_params["gpuMake"] == 'amd':
 			if pix_fmt_out == 'rgb0':
 				pix_fmt_out = 'yuv420p'
-			if cam_params["codec"] == 'h264':
-				codec = 'h264_amf'
-			elif cam_params["codec"] == 'h265':
-				codec = 'hevc_amf'
 			gpu_params = ['-r:v', str(cam_params["frameRate"]),
 						'-usage', 'lowlatency',
 						'-rc', 'cqp', # constant quantization parameter
@@ -77,10 +77,6 @@ def OpenWriter(cam_params):
 		elif cam_params["gpuMake"] == 'intel':
 			if pix_fmt_out == 'rgb0':
 				pix_fmt_out = 'nv12'
-			if cam_params["codec"] == 'h264':
-				codec = 'h264_qsv'
-			elif cam_params["codec"] == 'h265':
-				codec = 'hevc_qsv'
 			gpu_params = ['-r:v', str(cam_params["frameRate"]),
 						'-bf:v', '0',]
 
@@ -104,7 +100,7 @@ def OpenWriter(cam_params):
 				writer.send(None) # Initialize the generator
 				break
 			except Exception as e:
-				logging.error('Caught exception: {}'.format(e))
+				log.error('Caught exception: %s', e)
 				time.sleep(0.1)
 
 		except KeyboardInterrupt:
@@ -134,6 +130,6 @@ def WriteFrames(cam_params, writeQueue, stopQueue):
 			stopQueue.append('STOP GRABBING')
 
 	# Closing up...
-	print('Closing video writer for camera {}. Please wait...'.format(n_cam+1))
+	log.info('Closing video writer for camera %i. Please wait...', n_cam+1)
 	time.sleep(1)
 	writer.close()